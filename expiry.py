@@ -2,37 +2,148 @@
 import argparse
 import csv
 import json
+import operator
 import os
 import sys
-from datetime import datetime, timedelta
-from typing import List, Dict, Any, Optional
+from bisect import bisect_left, bisect_right
+from datetime import date, datetime, timedelta
+from typing import List, Dict, Any, Iterator, Optional, Tuple
+
+try:
+    import orjson  # optional, faster encoder for save_db
+except ImportError:
+    orjson = None
+try:
+    import ijson  # optional, lets find stream very large files
+except ImportError:
+    ijson = None
 
 DATA_FILE = os.path.join(os.path.dirname(__file__), "drugs.json")
+# Above this size (bytes) find streams records instead of loading the list.
+STREAM_THRESHOLD = 10 * 1024 * 1024
+CORRUPT_WARNING = "Warning: drugs.json is corrupted; starting with empty DB."
+
+# Record fields in storage/export column order.
+FIELDS = ("name", "strength", "form", "batch", "expiry", "location", "created_at")
+
+# (field, label) pairs shown after the dash in format_item, in order.
+EXTRA_FIELDS = (("batch", "batch"), ("expiry", "expiry"), ("location", "loc"))
+
+def expiry_key(it: Dict[str, Any]) -> str:
+    # Missing sorts last; null or other non-string values sort with the blanks,
+    # so neither ever lands in the soon/expired ranges.
+    e = it.get("expiry", "9999-12-31")
+    return e if isinstance(e, str) else ""
+
+def name_key(it: Dict[str, Any]) -> str:
+    n = it.get("name", "")
+    return n.lower() if isinstance(n, str) else ""
+
+# (mtime_ns, data, expiries) of the last successful load_db(); cleared by
+# save_db(). `expiries` is the expiry column of `data`, kept in parallel.
+_db_cache: Optional[Tuple[int, List[Dict[str, Any]], List[str]]] = None
+# Lowercased name column of the cached data; only find needs it, so it is
+# built on first use by name_column() and dropped whenever _db_cache changes.
+_name_cache: Optional[List[str]] = None
 
 def load_db() -> List[Dict[str, Any]]:
-    if not os.path.exists(DATA_FILE):
+    """Items sorted by expiry.
+
+    The list is shared with the cache and its columns: do not mutate it.
+    Copy it first, change the copy, and hand that to save_db().
+    """
+    global _db_cache, _name_cache
+    try:
+        mtime = os.stat(DATA_FILE).st_mtime_ns
+    except FileNotFoundError:
         return []
+    if _db_cache is not None and _db_cache[0] == mtime:
+        return _db_cache[1]
     with open(DATA_FILE, "r", encoding="utf-8") as f:
         try:
-            return json.load(f)
+            data = json.load(f)
         except json.JSONDecodeError:
-            print("Warning: drugs.json is corrupted; starting with empty DB.", file=sys.stderr)
+            print(CORRUPT_WARNING, file=sys.stderr)
             return []
+    # Range queries bisect on expiry. Compute each key once; files written by
+    # save_db are already sorted, otherwise reorder records and keys together.
+    keys = [expiry_key(it) for it in data]
+    if keys != sorted(keys):
+        order = sorted(range(len(data)), key=keys.__getitem__)
+        data = [data[i] for i in order]
+        keys = [keys[i] for i in order]
+    _db_cache = (mtime, data, keys)
+    _name_cache = None
+    return data
+
+def expiry_column(data: List[Dict[str, Any]]) -> List[str]:
+    """Sorted expiry strings parallel to `data`, as returned by load_db()."""
+    if _db_cache is not None and _db_cache[1] is data:
+        return _db_cache[2]
+    return [expiry_key(it) for it in data]
+
+def name_column(data: List[Dict[str, Any]]) -> List[str]:
+    """Lowercased names parallel to `data`, as returned by load_db()."""
+    global _name_cache
+    if _db_cache is not None and _db_cache[1] is data:
+        if _name_cache is None:
+            _name_cache = [name_key(it) for it in data]
+        return _name_cache
+    return [name_key(it) for it in data]
+
+def dump_db(data: List[Dict[str, Any]]) -> bytes:
+    # Compact by default; set TRACKER_PRETTY=1 for a human-readable file.
+    pretty = bool(os.environ.get("TRACKER_PRETTY"))
+    if orjson is not None:
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2 if pretty else 0)
+    if pretty:
+        fmt: Dict[str, Any] = {"indent": 2}
+    else:
+        fmt = {"separators": (",", ":")}
+    return json.dumps(data, ensure_ascii=False, **fmt).encode("utf-8")
 
 def save_db(data: List[Dict[str, Any]]) -> None:
-    with open(DATA_FILE, "w", encoding="utf-8") as f:
-        json.dump(data, f, indent=2, ensure_ascii=False)
+    global _db_cache, _name_cache
+    _db_cache = _name_cache = None
+    data.sort(key=expiry_key)
+    with open(DATA_FILE, "wb") as f:
+        f.write(dump_db(data))
+
+def find_matches(q: str) -> List[Tuple[str, Dict[str, Any]]]:
+    """(lowercased name, item) for names containing `q`, in expiry order.
+
+    Large files are streamed when ijson is installed. The result, including
+    the corrupted-file fallback, is the same as going through load_db().
+    """
+    if ijson is not None and _db_cache is None and os.path.exists(DATA_FILE) \
+            and os.path.getsize(DATA_FILE) > STREAM_THRESHOLD:
+        with open(DATA_FILE, "rb") as f:
+            try:
+                res = [(n, it) for it in ijson.items(f, "item", use_float=True)
+                       for n in (name_key(it),) if q in n]
+            except ijson.JSONError:
+                print(CORRUPT_WARNING, file=sys.stderr)
+                return []
+        res.sort(key=lambda x: expiry_key(x[1]))
+        return res
+    data = load_db()
+    return [(n, it) for n, it in zip(name_column(data), data) if q in n]
 
 def parse_date(s: str) -> str:
     try:
-        dt = datetime.strptime(s, "%Y-%m-%d")
-        return dt.strftime("%Y-%m-%d")
+        # Fast path for already-canonical input only: fromisoformat also
+        # takes 20261014 and 2026-W42-3, and rejects forms strptime allows
+        # (2026-1-5, "2026-10- 1"). Both paths zero-pad years below 1000.
+        if len(s) == 10 and s.isascii() and s[4] == s[7] == "-" \
+                and s[:4].isdigit() and s[5:7].isdigit() and s[8:].isdigit():
+            return date.fromisoformat(s).isoformat()
+        return datetime.strptime(s, "%Y-%m-%d").date().isoformat()
     except ValueError:
         print("Invalid date format; use YYYY-MM-DD.", file=sys.stderr)
         sys.exit(1)
 
 def add_item(args):
-    data = load_db()
+    data = list(load_db())
     item = {
         "name": args.name.strip(),
         "strength": (args.strength or "").strip(),
@@ -51,71 +162,73 @@ def list_items(args):
     if not data:
         print("No medicines yet. Use 'add' to add your first one.")
         return
-    # Sort by expiry ascending
-    data.sort(key=lambda x: x.get("expiry", "9999-12-31"))
+    # load_db() returns items sorted by expiry ascending
     for it in data:
         print(format_item(it))
 
 def soon_items(args):
     days = int(args.days)
     data = load_db()
-    today = datetime.today().date()
-    limit = today + timedelta(days=days)
-    soon = []
-    for it in data:
-        try:
-            exp = datetime.strptime(it.get("expiry","9999-12-31"), "%Y-%m-%d").date()
-        except ValueError:
-            continue
-        if today <= exp <= limit:
-            soon.append(it)
+    today = date.today()
+    # Stored expiries are normalised YYYY-MM-DD, so string order is date order.
+    today_str = today.isoformat()
+    limit_str = (today + timedelta(days=days)).isoformat()
+    expiries = expiry_column(data)
+    soon = data[bisect_left(expiries, today_str):bisect_right(expiries, limit_str)]
     if not soon:
         print(f"No items expiring in the next {days} days.")
         return
     print(f"Expiring in the next {days} days:")
-    for it in sorted(soon, key=lambda x: x["expiry"]):
+    for it in soon:
         print(format_item(it))
 
 def expired_items(args):
     data = load_db()
-    today = datetime.today().strftime("%Y-%m-%d")
-    ex = [it for it in data if it.get("expiry") and it["expiry"] < today]
+    today = date.today().isoformat()
+    expiries = expiry_column(data)
+    # Blank expiries sort first and are not "expired"; skip past them.
+    ex = data[bisect_right(expiries, ""):bisect_left(expiries, today)]
     if not ex:
         print("No expired items 🎉")
         return
     print("Expired items:")
-    for it in sorted(ex, key=lambda x: x["expiry"]):
+    for it in ex:
         print(format_item(it))
 
 def find_items(args):
     q = args.query.strip().lower()
-    data = load_db()
-    res = [it for it in data if q in it.get("name","").lower()]
+    res = find_matches(q)
     if not res:
         print("No matches.")
         return
-    for it in sorted(res, key=lambda x: x["name"].lower()):
+    res.sort(key=lambda x: x[0])
+    for _, it in res:
         print(format_item(it))
 
+_csv_row = operator.itemgetter(*FIELDS)
+
+def csv_rows(data: List[Dict[str, Any]]) -> Iterator[Tuple[Any, ...]]:
+    for it in data:
+        try:
+            yield _csv_row(it)
+        except KeyError:
+            yield tuple(it.get(k,"") for k in FIELDS)
+
 def export_csv(args):
     data = load_db()
     path = args.csv
     with open(path, "w", newline="", encoding="utf-8") as f:
-        w = csv.DictWriter(f, fieldnames=["name","strength","form","batch","expiry","location","created_at"])
-        w.writeheader()
-        for it in data:
-            w.writerow({k: it.get(k,"") for k in w.fieldnames})
+        w = csv.writer(f)
+        w.writerow(FIELDS)
+        w.writerows(csv_rows(data))
     print(f"Exported {len(data)} items to {path}")
 
 def format_item(it: Dict[str, Any]) -> str:
-    core = it.get("name","")
+    core = it.get("name") or ""
     if it.get("strength"): core += f" ({it['strength']})"
     if it.get("form"): core += f" {it['form']}"
-    extra = []
-    if it.get("batch"): extra.append(f"batch={it['batch']}")
-    if it.get("expiry"): extra.append(f"expiry={it['expiry']}")
-    if it.get("location"): extra.append(f"loc={it['location']}")
-    return f"- {core} — " + ", ".join(extra) if extra else f"- {core}"
+    extra = [f"{label}={it[k]}" for k, label in EXTRA_FIELDS if it.get(k)]
+    return f"- {core} — {', '.join(extra)}" if extra else f"- {core}"
 
 def main():
     p = argparse.ArgumentParser(description="Drug Expiry Tracker (simple, JSON-backed).")